@@ -1,7 +1,7 @@
 from .cli import main
 from .config import Config
 from .downloader import Downloader, DownloaderType
-from .metadata_manager import MetadataManager
+from .metadata_manager import DependencyGraph, MetadataManager
 from .operations import (
     calc_dependencies,
     cleanup_metadata,
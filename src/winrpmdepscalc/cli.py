@@ -49,6 +49,7 @@ def parse_args() -> argparse.Namespace:
 
 
 def main() -> None:
+    downloader = None
     try:
         args = parse_args()
         config = Config()
@@ -63,7 +64,9 @@ def main() -> None:
             _logger.warning("SSL verification disabled; HTTPS requests insecure.")
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-        downloader = Downloader(config.DOWNLOADER, skip_ssl_verify=config.SKIP_SSL_VERIFY)
+        downloader = Downloader(
+            config.DOWNLOADER, skip_ssl_verify=config.SKIP_SSL_VERIFY, pool_size=config.DOWNLOAD_CONCURRENCY
+        )
         metadata = MetadataManager(config, downloader)
 
         needs_metadata = any(
@@ -117,6 +120,9 @@ def main() -> None:
     except KeyboardInterrupt:
         _logger.warning("\nTerminated by user (Ctrl+C). Exiting...")
         sys.exit(0)
+    finally:
+        if downloader is not None:
+            downloader.close()
 
 
 if __name__ == "__main__":
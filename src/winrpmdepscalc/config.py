@@ -1,15 +1,24 @@
+import os
 import tempfile
 from pathlib import Path
+from typing import Optional, Tuple
+
+
+def _cache_dir_name() -> str:
+    return f"winrpmdepscalc-{os.getuid()}" if hasattr(os, "getuid") else "winrpmdepscalc"
 
 
 class Config:
+    _keys: Optional[Tuple[str, ...]] = None
+
     def __init__(self) -> None:
         self.REPO_BASE_URL: str = "https://dl.fedoraproject.org/pub/epel/9/Everything/x86_64/"
         self.REPOMD_XML: str = "repodata/repomd.xml"
         self.TEMP_DOWNLOAD_DIR: Path = Path(tempfile.gettempdir())
         self.LOCAL_REPOMD_FILE: Path = self.TEMP_DOWNLOAD_DIR / "repomd.xml"
         self.LOCAL_XZ_FILE: Path = self.TEMP_DOWNLOAD_DIR / "primary.xml.xz"
-        self.LOCAL_XML_FILE: Path = self.TEMP_DOWNLOAD_DIR / "primary.xml"
+        self.LOCAL_CACHE_FILE: Path = self.TEMP_DOWNLOAD_DIR / _cache_dir_name() / "maps.cache.pkl"
+        self.LOCAL_CACHE_META_FILE: Path = self.TEMP_DOWNLOAD_DIR / _cache_dir_name() / "maps.cache.meta"
         self.PACKAGE_COLUMNS: int = 4
         self.PACKAGE_COLUMN_WIDTH: int = 30
         self.DOWNLOAD_DIR: Path = Path("rpms")
@@ -17,24 +26,35 @@ class Config:
         self.SUPPORT_WEAK_DEPS: bool = False
         self.ONLY_LATEST_VERSION: bool = True
         self.DOWNLOADER: str = "powershell"
+        self.DOWNLOAD_CONCURRENCY: int = 8
+
+    @classmethod
+    def keys(cls) -> Tuple[str, ...]:
+        if cls._keys is None:
+            cls._keys = tuple(sorted(k for k in vars(cls()) if k.isupper()))
+        return cls._keys
 
     def update_from_dict(self, data: dict) -> None:
+        keys = self.keys()
+        current = vars(self)
         for key, value in data.items():
             key_upper = key.upper()
-            if hasattr(self, key_upper):
+            if key_upper in keys:
                 if key_upper == "TEMP_DOWNLOAD_DIR":
                     temp_dir = Path(value)
                     self.TEMP_DOWNLOAD_DIR = temp_dir
                     if self.LOCAL_REPOMD_FILE.parent != temp_dir:
                         self.LOCAL_REPOMD_FILE = temp_dir / "repomd.xml"
                         self.LOCAL_XZ_FILE = temp_dir / "primary.xml.xz"
-                        self.LOCAL_XML_FILE = temp_dir / "primary.xml"
+                        self.LOCAL_CACHE_FILE = temp_dir / _cache_dir_name() / "maps.cache.pkl"
+                        self.LOCAL_CACHE_META_FILE = temp_dir / _cache_dir_name() / "maps.cache.meta"
                 else:
-                    setattr(self, key_upper, value if not isinstance(getattr(self, key_upper), Path) else Path(value))
+                    setattr(self, key_upper, Path(value) if isinstance(current[key_upper], Path) else value)
 
     def to_dict(self) -> dict:
-        return {
-            k: (str(getattr(self, k)) if isinstance(getattr(self, k), Path) else getattr(self, k))
-            for k in dir(self)
-            if k.isupper()
-        }
+        data = vars(self)
+        result = {}
+        for k in self.keys():
+            value = data[k]
+            result[k] = str(value) if isinstance(value, Path) else value
+        return result
@@ -1,11 +1,16 @@
+import base64
 import logging
+import shutil
 import subprocess
+import threading
 from enum import Enum
 from pathlib import Path
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
 _logger = logging.getLogger("winrpmdepscalc")
 
@@ -20,8 +25,30 @@ class DownloaderType(Enum):
 
 
 class Downloader:
+    CHUNK_SIZE = 1 << 20
+    TIMEOUT = (5, 60)
+    PROGRESS_INTERVAL = 0.25
+    PS_DOWNLOAD_SCRIPT = r"""
+$wc = New-Object System.Net.WebClient
+$wc.Proxy.Credentials = [System.Net.CredentialCache]::DefaultNetworkCredentials
+$in = New-Object System.IO.StreamReader([Console]::OpenStandardInput(), (New-Object System.Text.UTF8Encoding $false))
+while ($null -ne ($line = $in.ReadLine())) {
+    $url, $out = $line -split "`t", 2
+    try {
+        $wc.DownloadFile($url, $out)
+        [Console]::Out.WriteLine("OK")
+    } catch {
+        [Console]::Out.WriteLine("ERR " + ($_.Exception.Message -replace "\r?\n", " "))
+    }
+}
+"""
+
     def __init__(
-        self, downloader_type: str = "powershell", proxy_url: Optional[str] = None, skip_ssl_verify: bool = True
+        self,
+        downloader_type: str = "powershell",
+        proxy_url: Optional[str] = None,
+        skip_ssl_verify: bool = True,
+        pool_size: int = 8,
     ) -> None:
         dt = downloader_type.lower()
         if not DownloaderType.has_value(dt):
@@ -30,6 +57,10 @@ class Downloader:
         self.downloader_type = DownloaderType(dt)
         if self.downloader_type == DownloaderType.PYTHON:
             self.session = requests.Session()
+            retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
             if proxy_url:
                 self.session.proxies = {"http": proxy_url, "https": proxy_url}
             else:
@@ -37,39 +68,127 @@ class Downloader:
             self.session.verify = not skip_ssl_verify
         else:
             self.session = None
+        self._ps_lock = threading.Lock()
+        self._ps_idle: List[subprocess.Popen] = []
+        self._ps_procs: List[subprocess.Popen] = []
+
+    def __enter__(self) -> "Downloader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
 
-    def download(self, url: str, output_file: Union[str, Path]) -> None:
+    def close(self) -> None:
+        with self._ps_lock:
+            procs, self._ps_procs, self._ps_idle = self._ps_procs, [], []
+        for proc in procs:
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=5)
+            except Exception:
+                proc.kill()
+        if self.session is not None:
+            self.session.close()
+
+    def download(self, url: str, output_file: Union[str, Path], resume: bool = False) -> None:
         if self.downloader_type == DownloaderType.POWERSHELL:
             self._download_powershell(url, output_file)
         else:
-            self._download_python(url, output_file)
+            self._download_python(url, output_file, resume)
 
-    def _download_powershell(self, url: str, output_file: Union[str, Path]) -> None:
-        ps_script = (
-            f"$wc = New-Object System.Net.WebClient; "
-            f"$wc.Proxy.Credentials = [System.Net.CredentialCache]::DefaultNetworkCredentials; "
-            f"$wc.DownloadFile('{url}', '{output_file}');"
+    def _acquire_ps_proc(self) -> subprocess.Popen:
+        with self._ps_lock:
+            while self._ps_idle:
+                proc = self._ps_idle.pop()
+                if proc.poll() is None:
+                    return proc
+                self._ps_procs.remove(proc)
+        encoded = base64.b64encode(Downloader.PS_DOWNLOAD_SCRIPT.encode("utf-16-le")).decode("ascii")
+        proc = subprocess.Popen(
+            ["powershell", "-NoProfile", "-NoLogo", "-NonInteractive", "-EncodedCommand", encoded],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
         )
-        result = subprocess.run(["powershell", "-NoProfile", "-Command", ps_script], capture_output=True, text=True)
-        if result.returncode != 0:
-            _logger.error(f"PowerShell download failed:\n{result.stderr.strip()}")
-            raise RuntimeError(f"PowerShell download failed:\n{result.stderr.strip()}")
-        _logger.info(f"Downloaded {output_file} via PowerShell")
+        with self._ps_lock:
+            self._ps_procs.append(proc)
+        return proc
+
+    def _release_ps_proc(self, proc: subprocess.Popen, reusable: bool) -> None:
+        with self._ps_lock:
+            if reusable and proc in self._ps_procs:
+                self._ps_idle.append(proc)
+                return
+            if proc in self._ps_procs:
+                self._ps_procs.remove(proc)
+        proc.kill()
+
+    def _download_powershell(self, url: str, output_file: Union[str, Path]) -> None:
+        out_path = str(Path(output_file).resolve())
+        if any(c in arg for arg in (url, out_path) for c in "\t\r\n"):
+            raise ValueError(f"Cannot pass control characters to PowerShell downloader: {url!r} -> {out_path!r}")
+        proc = self._acquire_ps_proc()
+        output = []
+        reusable = False
+        try:
+            proc.stdin.write(f"{url}\t{out_path}\n")
+            for line in proc.stdout:
+                line = line.rstrip()
+                if line == "OK":
+                    reusable = True
+                    _logger.info(f"Downloaded {output_file} via PowerShell")
+                    return
+                if line.startswith("ERR "):
+                    reusable = True
+                    output.append(line[4:])
+                    break
+                output.append(line)
+        except OSError as e:
+            output.append(str(e))
+        finally:
+            self._release_ps_proc(proc, reusable)
+        error = "\n".join(output).strip()
+        _logger.error(f"PowerShell download failed:\n{error}")
+        raise RuntimeError(f"PowerShell download failed:\n{error}")
 
-    def _download_python(self, url: str, output_file: Union[str, Path]) -> None:
+    def _download_python(self, url: str, output_file: Union[str, Path], resume: bool = False) -> None:
         if not self.session:
             raise RuntimeError("Python downloader session not initialized")
+        offset = 0
+        if resume:
+            try:
+                offset = Path(output_file).stat().st_size
+            except FileNotFoundError:
+                pass
         try:
-            with self.session.get(url, stream=True) as resp:
+            headers = {"Accept-Encoding": "identity"}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+            resp = self.session.get(url, stream=True, timeout=Downloader.TIMEOUT, headers=headers)
+            if offset and resp.status_code == 416:
+                resp.close()
+                del headers["Range"]
+                resp = self.session.get(url, stream=True, timeout=Downloader.TIMEOUT, headers=headers)
+            with resp:
                 resp.raise_for_status()
-                total = int(resp.headers.get("content-length", 0))
-                with open(output_file, "wb") as f, tqdm(
-                    total=total, unit="iB", unit_scale=True, desc=Path(output_file).name
-                ) as bar:
-                    for chunk in resp.iter_content(chunk_size=1024):
-                        if chunk:
-                            f.write(chunk)
-                            bar.update(len(chunk))
+                if resp.status_code != 206:
+                    offset = 0
+                total = offset + int(resp.headers.get("content-length", 0))
+                resp.raw.decode_content = True
+                with open(output_file, "ab" if offset else "wb") as f, tqdm.wrapattr(
+                    resp.raw,
+                    "read",
+                    total=total,
+                    initial=offset,
+                    unit="iB",
+                    unit_scale=True,
+                    mininterval=Downloader.PROGRESS_INTERVAL,
+                    desc=Path(output_file).name,
+                ) as raw:
+                    shutil.copyfileobj(raw, f, length=Downloader.CHUNK_SIZE)
             _logger.info(f"Downloaded {output_file} via Python requests")
         except Exception as e:
             _logger.error(f"Failed to download {url}: {e}")
@@ -1,35 +1,249 @@
+import bisect
 import bz2
+import contextlib
 import fnmatch
-import functools
 import gzip
+import hashlib
+import io
+import json
 import logging
 import lzma
+import os
+import pickle
+import re
+import shutil
+import stat
+import subprocess
+import sys
 import xml.etree.ElementTree as ET
-from collections import defaultdict, deque
+from array import array
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import BinaryIO, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urljoin
 
+try:
+    from lxml import etree as LET
+except ImportError:
+    LET = None
+
 _logger = logging.getLogger("winrpmdepscalc")
 
+_XML_ERRORS = (ET.ParseError, EOFError, OSError, lzma.LZMAError) + ((LET.Error,) if LET is not None else ())
+
+PackageLocation = Tuple[int, str, str, str, int]
+
+_NS_REPO = "{http://linux.duke.edu/metadata/repo}"
+_NS_COMMON = "{http://linux.duke.edu/metadata/common}"
+_NS_RPM = "{http://linux.duke.edu/metadata/rpm}"
+
+_REPO_DATA = _NS_REPO + "data"
+_REPO_CHECKSUM = _NS_REPO + "checksum"
+_REPO_LOCATION = _NS_REPO + "location"
+_PACKAGE = _NS_COMMON + "package"
+_NAME = _NS_COMMON + "name"
+_VERSION = _NS_COMMON + "version"
+_LOCATION = _NS_COMMON + "location"
+_SIZE = _NS_COMMON + "size"
+_FORMAT = _NS_COMMON + "format"
+_PROVIDES = _NS_RPM + "provides"
+_REQUIRES = _NS_RPM + "requires"
+_WEAKREQUIRES = _NS_RPM + "weakrequires"
+
+_GLOB_CHARS_RE = re.compile(r"[*?\[]")
+_CASE_SENSITIVE_GLOB = os.path.normcase("Aa") == "Aa"
+
+_VERSION_SEGMENT_RE = re.compile(r"([0-9]+)|([A-Za-z]+)|(~)|(\^)")
+
+
+def rpm_version_key(version: str) -> tuple:
+    key = []
+    for num, alpha, tilde, caret in _VERSION_SEGMENT_RE.findall(version):
+        if num:
+            key.append((4, int(num)))
+        elif alpha:
+            key.append((3, alpha))
+        elif tilde:
+            key.append((0,))
+        else:
+            key.append((2,))
+    key.append((1,))
+    return tuple(key)
+
+
+def evr_key(epoch: int, ver: str, rel: str) -> tuple:
+    return epoch, rpm_version_key(ver), rpm_version_key(rel)
+
+
+class DependencyGraph(Mapping):
+    def __init__(self, names: List[str], indptr: array, indices: array) -> None:
+        self.names = names
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.indptr = indptr
+        self.indices = indices
+        self._closures: Dict[int, FrozenSet[str]] = {}
+        self._condense()
+
+    @classmethod
+    def build(cls, requires_map: Dict[str, Set[str]], provides_map: Dict[str, Set[str]]) -> "DependencyGraph":
+        names = list(requires_map)
+        ids = {name: i for i, name in enumerate(names)}
+        indptr = array("q", [0])
+        indices = array("i")
+        provider_ids: Dict[str, FrozenSet[int]] = {}
+        empty: FrozenSet[int] = frozenset()
+        for name in names:
+            deps: Set[int] = set()
+            for req in requires_map[name]:
+                providers = provider_ids.get(req)
+                if providers is None:
+                    providers = provider_ids[req] = frozenset(ids[p] for p in provides_map.get(req, empty))
+                deps.update(providers)
+            indices.extend(sorted(deps))
+            indptr.append(len(indices))
+        return cls(names, indptr, indices)
+
+    def __getitem__(self, name: str) -> Set[str]:
+        i = self.ids[name]
+        return {self.names[j] for j in self.indices[self.indptr[i] : self.indptr[i + 1]]}
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _condense(self) -> None:
+        n = len(self.names)
+        indptr, indices = self.indptr, self.indices
+        index = [-1] * n
+        low = [0] * n
+        on_stack = bytearray(n)
+        comp = array("i", bytes(4 * n))
+        stack: List[int] = []
+        counter = 0
+        ncomp = 0
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [[root, indptr[root]]]
+            while work:
+                frame = work[-1]
+                v, pos = frame
+                if pos < indptr[v + 1]:
+                    frame[1] = pos + 1
+                    w = indices[pos]
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = 1
+                        work.append([w, indptr[w]])
+                    elif on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                    continue
+                work.pop()
+                if work and low[v] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[v]
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        comp[w] = ncomp
+                        if w == v:
+                            break
+                    ncomp += 1
+
+        members: List[List[int]] = [[] for _ in range(ncomp)]
+        for v in range(n):
+            members[comp[v]].append(v)
+        names = self.names
+        self.comp = comp
+        self.comp_names: List[Tuple[str, ...]] = [tuple(names[v] for v in m) for m in members]
+        self.comp_indptr = array("q", [0])
+        self.comp_indices = array("i")
+        for c in range(ncomp):
+            succ = {comp[w] for v in members[c] for w in indices[indptr[v] : indptr[v + 1]]}
+            succ.discard(c)
+            self.comp_indices.extend(sorted(succ))
+            self.comp_indptr.append(len(self.comp_indices))
+
+    def _walk(self, starts: Iterable[int]) -> Set[str]:
+        indptr, indices = self.comp_indptr, self.comp_indices
+        closures = self._closures
+        visited = bytearray(len(indptr) - 1)
+        stack: List[int] = []
+        for c in starts:
+            if not visited[c]:
+                visited[c] = 1
+                stack.append(c)
+        found = list(stack)
+        known: List[FrozenSet[str]] = []
+        pop, push, add = stack.pop, stack.append, found.append
+        while stack:
+            u = pop()
+            for v in indices[indptr[u] : indptr[u + 1]]:
+                if not visited[v]:
+                    visited[v] = 1
+                    if v in closures:
+                        known.append(closures[v])
+                    else:
+                        add(v)
+                        push(v)
+        comp_names = self.comp_names
+        result: Set[str] = set()
+        update = result.update
+        for c in found:
+            update(comp_names[c])
+        for names in known:
+            update(names)
+        return result
+
+    def closure(self, name: str) -> Optional[FrozenSet[str]]:
+        start = self.ids.get(name)
+        if start is None:
+            return None
+        c = self.comp[start]
+        result = self._closures.get(c)
+        if result is None:
+            result = self._closures[c] = frozenset(self._walk((c,)))
+        return result
+
+    def closure_many(self, names: Iterable[str]) -> Set[str]:
+        ids, comp = self.ids, self.comp
+        return self._walk(comp[ids[name]] for name in names if name in ids)
+
 
 class MetadataManager:
-    NS_REPO = {"repo": "http://linux.duke.edu/metadata/repo"}
-    NS_COMMON = {"common": "http://linux.duke.edu/metadata/common", "rpm": "http://linux.duke.edu/metadata/rpm"}
+    CACHE_VERSION = 7
+    READ_BUFFER_SIZE = 1 << 20
+    DECOMPRESSORS = [
+        ("xz", b"\xfd7zXZ\x00", lzma.open),
+        ("gzip", b"\x1f\x8b", gzip.open),
+        ("bzip2", b"BZh", bz2.open),
+    ]
 
     def __init__(self, config, downloader) -> None:
         self.config = config
         self.downloader = downloader
         self.all_packages: List[str] = []
         self.requires_map: Dict[str, Set[str]] = {}
-        self.provides_map: Dict[str, Set[str]] = defaultdict(set)
-        self.dep_map: Dict[str, Set[str]] = {}
-        self.primary_root: Optional[ET.Element] = None
+        self.provides_map: Dict[str, Set[str]] = {}
+        self.dep_map: DependencyGraph = DependencyGraph.build({}, {})
+        self.location_map: Dict[str, List[PackageLocation]] = {}
         self.metadata_loaded: bool = False
         self.repomd_root: Optional[ET.Element] = None
 
     def check_and_refresh_metadata(self, force_refresh: bool = False) -> None:
-        required_files = [self.config.LOCAL_REPOMD_FILE, self.config.LOCAL_XZ_FILE, self.config.LOCAL_XML_FILE]
+        required_files = [self.config.LOCAL_REPOMD_FILE, self.config.LOCAL_XZ_FILE]
         missing = [str(f) for f in required_files if not f.exists()]
         if missing or force_refresh:
             _logger.warning(f"Missing or refresh forced for metadata files: {', '.join(missing)}")
@@ -46,50 +260,160 @@ class MetadataManager:
             if not primary_url:
                 raise RuntimeError("Primary URL not found in repomd.xml")
 
-            self.downloader.download(primary_url, self.config.LOCAL_XZ_FILE)
-            self._decompress_file(self.config.LOCAL_XZ_FILE, self.config.LOCAL_XML_FILE)
+            cache_key = self._get_cache_key(self.repomd_root)
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                cached = pool.submit(self._read_cached_maps, cache_key)
+                self.downloader.download(primary_url, self.config.LOCAL_XZ_FILE)
+                maps = cached.result()
+            if not self._primary_matches(cache_key):
+                cache_key = maps = None
 
             self._reset_metadata_state()
-            self.primary_root = self._parse_xml(self.config.LOCAL_XML_FILE)
-            if self.primary_root is None:
-                raise RuntimeError("Failed to parse primary.xml")
-            self._load_metadata_maps()
-            self.metadata_loaded = True
+            self._load_metadata(cache_key, maps)
         else:
             _logger.info("All metadata files present, skipping refresh.")
             if not self.metadata_loaded:
-                self.primary_root = self._parse_xml(self.config.LOCAL_XML_FILE)
-                if self.primary_root is None:
-                    raise RuntimeError("Failed to parse primary XML metadata on startup")
-                self._load_metadata_maps()
-                self.metadata_loaded = True
+                self.repomd_root = self._parse_xml(self.config.LOCAL_REPOMD_FILE)
+                cache_key = self._get_cache_key(self.repomd_root) if self.repomd_root is not None else None
+                if not self._primary_matches(cache_key):
+                    cache_key = None
+                self._load_metadata(cache_key, self._read_cached_maps(cache_key))
 
     def cleanup_files(self) -> None:
         files = [
             self.config.LOCAL_REPOMD_FILE,
             self.config.LOCAL_XZ_FILE,
-            self.config.LOCAL_XML_FILE,
+            self.config.LOCAL_CACHE_FILE,
+            self.config.LOCAL_CACHE_META_FILE,
         ]
         deleted_any = False
         for f in files:
             try:
-                if f.exists():
-                    f.unlink()
-                    _logger.info(f"Removed {f}")
-                    deleted_any = True
+                f.unlink()
+                _logger.info(f"Removed {f}")
+                deleted_any = True
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 _logger.error(f"Failed to remove {f}: {e}")
         if not deleted_any:
             _logger.warning("No metadata files to remove.")
         self._reset_metadata_state()
-        self.primary_root = None
         self.metadata_loaded = False
 
     def _reset_metadata_state(self) -> None:
         self.all_packages.clear()
         self.requires_map.clear()
         self.provides_map.clear()
-        self.dep_map.clear()
+        self.dep_map = DependencyGraph.build({}, {})
+        self.location_map.clear()
+
+    def _load_metadata(self, cache_key: Optional[dict], maps: Optional[dict]) -> None:
+        if maps is not None:
+            self.all_packages = maps["all_packages"]
+            self.requires_map = maps["requires_map"]
+            self.provides_map = maps["provides_map"]
+            self.location_map = maps["location_map"]
+            self.dep_map = DependencyGraph.build(self.requires_map, self.provides_map)
+        else:
+            self._load_metadata_maps()
+            self._save_cached_maps(cache_key)
+        self.metadata_loaded = True
+
+    def _get_cache_key(self, repomd_root: ET.Element) -> Optional[dict]:
+        data = self._find_primary_data(repomd_root)
+        checksum = data.find(_REPO_CHECKSUM) if data is not None else None
+        if checksum is None or not checksum.text:
+            return None
+        return {
+            "version": MetadataManager.CACHE_VERSION,
+            "checksum_type": checksum.get("type", "sha256"),
+            "checksum": checksum.text.strip().lower(),
+            "support_weak_deps": bool(self.config.SUPPORT_WEAK_DEPS),
+        }
+
+    def _primary_matches(self, cache_key: Optional[dict]) -> bool:
+        if cache_key is None:
+            return False
+        path = self.config.LOCAL_XZ_FILE
+        algorithm = cache_key["checksum_type"]
+        try:
+            digest = hashlib.new("sha1" if algorithm == "sha" else algorithm)
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(MetadataManager.READ_BUFFER_SIZE), b""):
+                    digest.update(block)
+        except (OSError, ValueError) as e:
+            _logger.warning(f"Cannot verify {path} against repomd.xml: {e}")
+            return False
+        if digest.hexdigest() != cache_key["checksum"]:
+            _logger.warning(f"{path} does not match the checksum in repomd.xml, not using the metadata cache.")
+            return False
+        return True
+
+    def _read_cached_maps(self, cache_key: Optional[dict]) -> Optional[dict]:
+        cache_file, meta_file = self.config.LOCAL_CACHE_FILE, self.config.LOCAL_CACHE_META_FILE
+        if cache_key is None:
+            return None
+        try:
+            if not self._cache_dir_is_private():
+                return None
+            with open(meta_file, "r") as f:
+                if json.load(f) != cache_key:
+                    return None
+            with open(cache_file, "rb") as f:
+                if not self._is_private(os.fstat(f.fileno()), 0o022):
+                    _logger.warning(
+                        f"Refusing to load {cache_file}: not owned by the current user or writable by others."
+                    )
+                    return None
+                maps = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            _logger.warning(f"Ignoring unreadable metadata cache {cache_file}: {e}")
+            return None
+        _logger.info(f"Loaded metadata maps from cache {cache_file}")
+        return maps
+
+    @staticmethod
+    def _is_private(st: os.stat_result, forbidden_mode: int) -> bool:
+        return not hasattr(os, "getuid") or (st.st_uid == os.getuid() and not st.st_mode & forbidden_mode)
+
+    def _cache_dir_is_private(self) -> bool:
+        for directory in {self.config.LOCAL_CACHE_FILE.parent, self.config.LOCAL_CACHE_META_FILE.parent}:
+            st = os.lstat(directory)
+            if not stat.S_ISDIR(st.st_mode) or not self._is_private(st, 0o077):
+                _logger.warning(
+                    f"Not using metadata cache in {directory}: not a private directory of the current user."
+                )
+                return False
+        return True
+
+    def _save_cached_maps(self, cache_key: Optional[dict]) -> None:
+        if cache_key is None:
+            return
+        cache_file, meta_file = self.config.LOCAL_CACHE_FILE, self.config.LOCAL_CACHE_META_FILE
+        maps = {
+            "all_packages": self.all_packages,
+            "requires_map": self.requires_map,
+            "provides_map": self.provides_map,
+            "location_map": self.location_map,
+        }
+        try:
+            for directory in {cache_file.parent, meta_file.parent}:
+                directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            if not self._cache_dir_is_private():
+                return
+            try:
+                meta_file.unlink()
+            except FileNotFoundError:
+                pass
+            with open(cache_file, "wb") as f:
+                pickle.dump(maps, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(meta_file, "w") as f:
+                json.dump(cache_key, f)
+        except Exception as e:
+            _logger.warning(f"Failed to write metadata cache {cache_file}: {e}")
 
     def _parse_xml(self, path: Path) -> Optional[ET.Element]:
         _logger.info(f"Parsing XML file {path}")
@@ -99,103 +423,175 @@ class MetadataManager:
             _logger.error(f"Failed to parse XML {path}: {e}")
             return None
 
-    def _get_primary_location_url(self, repomd_root: ET.Element) -> Optional[str]:
-        for data in repomd_root.findall("repo:data", MetadataManager.NS_REPO):
+    def _find_primary_data(self, repomd_root: ET.Element) -> Optional[ET.Element]:
+        for data in repomd_root.findall(_REPO_DATA):
             if data.attrib.get("type") == "primary":
-                location = data.find("repo:location", MetadataManager.NS_REPO)
-                if location is not None:
-                    href = location.attrib.get("href")
-                    if href:
-                        return href if href.startswith("http") else urljoin(self.config.REPO_BASE_URL, href)
+                return data
         return None
 
-    def _decompress_file(self, input_path: Path, output_path: Path) -> None:
-        _logger.info(f"Decompressing {input_path} to {output_path}...")
-
-        decompressors = [
-            ("gzip", gzip.open),
-            ("bzip2", bz2.open),
-            ("xz", lzma.open),
-        ]
-
-        for name, opener in decompressors:
-            try:
-                with opener(input_path, "rb") as f_in, open(output_path, "wb") as f_out:
-                    f_out.write(f_in.read())
-                _logger.info(f"Decompression complete using {name}.")
-                return
-            except Exception:
-                continue
+    def _get_primary_location_url(self, repomd_root: ET.Element) -> Optional[str]:
+        data = self._find_primary_data(repomd_root)
+        if data is not None:
+            location = data.find(_REPO_LOCATION)
+            if location is not None:
+                href = location.attrib.get("href")
+                if href:
+                    return href if href.startswith("http") else urljoin(self.config.REPO_BASE_URL, href)
+        return None
 
-        _logger.error("Unsupported or corrupted compression format.")
-        raise RuntimeError("Unsupported or corrupted compression format.")
+    @contextlib.contextmanager
+    def _open_compressed(self, path: Path) -> Iterator[BinaryIO]:
+        with open(path, "rb") as f:
+            head = f.read(6)
 
-    def _load_metadata_maps(self) -> None:
-        if self.primary_root is None:
-            self.primary_root = self._parse_xml(self.config.LOCAL_XML_FILE)
-            if self.primary_root is None:
-                raise RuntimeError("Failed to load primary XML metadata")
+        for name, magic, opener in MetadataManager.DECOMPRESSORS:
+            if head.startswith(magic):
+                break
+        else:
+            _logger.error("Unsupported or corrupted compression format.")
+            raise RuntimeError("Unsupported or corrupted compression format.")
 
-        ns = MetadataManager.NS_COMMON
+        xz = shutil.which("xz") if name == "xz" else None
+        if xz is None:
+            _logger.info(f"Streaming {path} through {name} decompression.")
+            with io.BufferedReader(opener(path, "rb"), buffer_size=MetadataManager.READ_BUFFER_SIZE) as stream:
+                yield stream
+            return
 
-        self.all_packages = sorted(
-            pkg.find("common:name", ns).text
-            for pkg in self.primary_root.findall("common:package", ns)
-            if pkg.find("common:name", ns) is not None
+        _logger.info(f"Streaming {path} through {xz} -T0.")
+        proc = subprocess.Popen(
+            [xz, "-T0", "-dc", str(path)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=MetadataManager.READ_BUFFER_SIZE,
         )
+        try:
+            yield proc.stdout
+        finally:
+            proc.stdout.close()
+            error = proc.stderr.read().decode(errors="replace").strip()
+            proc.stderr.close()
+            returncode = proc.wait()
+        if returncode:
+            raise lzma.LZMAError(error or f"xz exited with status {returncode}")
 
+    def _iter_packages(self, path: Path) -> Iterator[ET.Element]:
+        _logger.info(f"Parsing XML file {path}")
+        try:
+            with self._open_compressed(path) as f:
+                if LET is not None:
+                    for _, elem in LET.iterparse(f, events=("end",), tag=_PACKAGE, huge_tree=True):
+                        yield elem
+                        elem.clear()
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
+                else:
+                    for _, elem in ET.iterparse(f):
+                        if elem.tag == _PACKAGE:
+                            yield elem
+                            elem.clear()
+        except _XML_ERRORS as e:
+            _logger.error(f"Failed to parse XML {path}: {e}")
+            raise RuntimeError("Failed to parse primary.xml") from e
+
+    def _load_metadata_maps(self) -> None:
+        all_packages: List[str] = []
         self.requires_map.clear()
         self.provides_map.clear()
-        pkgs_with_format = []
+        self.location_map.clear()
 
-        for pkg in self.primary_root.findall("common:package", ns):
-            name_elem = pkg.find("common:name", ns)
-            if name_elem is None:
+        intern = sys.intern
+        add_package = all_packages.append
+        requires_map = self.requires_map
+        provides_map = self.provides_map
+        get_providers = provides_map.get
+        location_map = self.location_map
+        weak_deps = self.config.SUPPORT_WEAK_DEPS
+
+        for pkg in self._iter_packages(self.config.LOCAL_XZ_FILE):
+            pkg_name = version = href = size = fmt = None
+            for child in pkg:
+                tag = child.tag
+                if tag == _NAME:
+                    pkg_name = child.text
+                elif tag == _VERSION:
+                    version = child
+                elif tag == _LOCATION:
+                    href = child.get("href")
+                elif tag == _SIZE:
+                    size = child
+                elif tag == _FORMAT:
+                    fmt = child
+            if not pkg_name:
                 continue
-            pkg_name = name_elem.text
-            fmt = pkg.find("common:format", ns)
+            pkg_name = intern(pkg_name)
+            add_package(pkg_name)
+
+            if version is not None and href:
+                try:
+                    epoch = int(version.get("epoch", "0"))
+                    package_size = int(size.get("package", "0")) if size is not None else 0
+                    location_map.setdefault(pkg_name, []).append(
+                        (epoch, version.get("ver", ""), version.get("rel", ""), href, package_size)
+                    )
+                except ValueError as e:
+                    _logger.warning(f"Skipping package {pkg_name} due to version parsing error: {e}")
+
             if fmt is None:
-                self.requires_map[pkg_name] = set()
+                requires_map.setdefault(pkg_name, set())
                 continue
-            prov = fmt.find("rpm:provides", ns)
-            if prov is not None:
-                for entry in prov.findall("rpm:entry", ns):
-                    pname = entry.get("name")
-                    if pname:
-                        self.provides_map[pname].add(pkg_name)
-            pkgs_with_format.append((pkg_name, fmt))
-
-        for pkg_name, fmt in pkgs_with_format:
-            req = fmt.find("rpm:requires", ns)
-            req_set = {entry.get("name") for entry in req.findall("rpm:entry", ns)} if req is not None else set()
-
-            if self.config.SUPPORT_WEAK_DEPS:
-                weak = fmt.find("rpm:weakrequires", ns)
-                if weak is not None:
-                    req_set.update(entry.get("name") for entry in weak.findall("rpm:entry", ns))
-            self.requires_map[pkg_name] = req_set
-
-        self.dep_map = {
-            pkg: {dep for req in reqs if req in self.provides_map for dep in self.provides_map[req]}
-            for pkg, reqs in self.requires_map.items()
-        }
+            req_set = set()
+            for section in fmt:
+                tag = section.tag
+                if tag == _PROVIDES:
+                    for entry in section:
+                        pname = entry.get("name")
+                        if pname:
+                            providers = get_providers(pname)
+                            if providers is None:
+                                provides_map[intern(pname)] = {pkg_name}
+                            else:
+                                providers.add(pkg_name)
+                elif tag == _REQUIRES or (weak_deps and tag == _WEAKREQUIRES):
+                    req_set.update(intern(n) for n in (e.get("name") for e in section) if n)
+            requires_map[pkg_name] = req_set
+
+        for entries in self.location_map.values():
+            entries.sort(key=lambda e: evr_key(e[0], e[1], e[2]))
+
+        self.all_packages = sorted(all_packages)
+        self.dep_map = DependencyGraph.build(self.requires_map, self.provides_map)
 
     def filter_packages(self, patterns: List[str]) -> List[str]:
         patterns = [p.strip() for p in patterns if p.strip()]
-        return sorted(pkg for pkg in self.all_packages if any(fnmatch.fnmatch(pkg, pat) for pat in patterns))
+        packages = self.all_packages
+        if _CASE_SENSITIVE_GLOB and patterns and not any(_GLOB_CHARS_RE.search(p.rstrip("*")) for p in patterns):
+            ranges = []
+            for pat in patterns:
+                prefix = pat.rstrip("*")
+                lo = bisect.bisect_left(packages, prefix)
+                hi = (
+                    bisect.bisect_left(packages, prefix + "\U0010ffff")
+                    if pat != prefix
+                    else bisect.bisect_right(packages, prefix)
+                )
+                ranges.append((lo, hi))
+            selected: List[str] = []
+            end = 0
+            for lo, hi in sorted(ranges):
+                lo = max(lo, end)
+                if lo < hi:
+                    selected.extend(packages[lo:hi])
+                    end = hi
+            return selected
+        if not patterns:
+            return []
+        flags = 0 if _CASE_SENSITIVE_GLOB else re.IGNORECASE
+        match = re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns), flags).match
+        return [pkg for pkg in packages if match(pkg)]
 
-    @functools.lru_cache(maxsize=None)
-    def resolve_all_dependencies(self, pkg_name: str) -> Optional[Set[str]]:
-        if pkg_name not in self.dep_map:
-            return None
-        to_install: Set[str] = set()
-        queue = deque([pkg_name])
-        while queue:
-            current = queue.popleft()
-            if current in to_install:
-                continue
-            to_install.add(current)
-            for dep in self.dep_map.get(current, set()):
-                if dep not in to_install:
-                    queue.append(dep)
-        return to_install
+    def resolve_all_dependencies(self, pkg_name: str) -> Optional[FrozenSet[str]]:
+        return self.dep_map.closure(pkg_name)
+
+    def resolve_dependencies(self, pkg_names: Iterable[str]) -> Set[str]:
+        return self.dep_map.closure_many(pkg_names)
@@ -1,19 +1,21 @@
 import fnmatch
 import sys
-import xml.etree.ElementTree as ET
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple, Union
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 
 import yaml
 from tqdm import tqdm
 
 from .config import Config
-from .downloader import Downloader
-from .metadata_manager import MetadataManager
+from .downloader import DownloaderType
+from .metadata_manager import MetadataManager, PackageLocation
 from .utils import LogColors, _logger
 
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 def parse_package_names(package_names_str: Optional[str]) -> Optional[List[str]]:
     if not package_names_str:
@@ -47,115 +49,103 @@ def select_packages(
         include_deps = ask_include_deps
 
     if include_deps:
-        all_pkgs = set(selected)
-        for pkg in selected:
-            deps = metadata.resolve_all_dependencies(pkg)
-            if deps:
-                all_pkgs.update(deps)
+        all_pkgs = metadata.resolve_dependencies(selected)
+        all_pkgs.update(selected)
         return sorted(all_pkgs)
 
-    return sorted(selected)
+    return selected
 
 
 def print_packages_tabular(packages: List[str], columns: int = 4, column_width: int = 30) -> None:
     if not packages:
         _logger.error("No packages found.")
         return
-    for i, pkg in enumerate(packages, 1):
-        print(f"{LogColors.MAGENTA}{pkg:<{column_width}}{LogColors.RESET}", end="")
-        if i % columns == 0:
-            print()
-    if len(packages) % columns != 0:
-        print()
-
-
-def get_package_rpm_urls(
-    root: ET.Element, base_url: str, package_names: List[str], only_latest: bool = True
-) -> List[Tuple[str, str]]:
-    ns = MetadataManager.NS_COMMON
-    packages_by_name: Dict[str, List[Dict[str, Union[str, int]]]] = defaultdict(list)
-
-    for pkg in root.findall("common:package", ns):
-        name_elem = pkg.find("common:name", ns)
-        if name_elem is None or name_elem.text not in package_names:
-            continue
-
-        version = pkg.find("common:version", ns)
-        location = pkg.find("common:location", ns)
-        if version is None or location is None:
-            continue
+    cells = [f"{LogColors.MAGENTA}{pkg:<{column_width}}{LogColors.RESET}" for pkg in packages]
+    rows = ("".join(cells[i : i + columns]) for i in range(0, len(cells), columns))
+    sys.stdout.write("\n".join(rows) + "\n")
+    sys.stdout.flush()
 
-        href = location.attrib.get("href")
-        if not href:
-            continue
-
-        try:
-            packages_by_name[name_elem.text].append(
-                {
-                    "ver": version.attrib.get("ver", ""),
-                    "rel": version.attrib.get("rel", ""),
-                    "epoch": int(version.attrib.get("epoch", "0")),
-                    "href": href,
-                    "name": name_elem.text,
-                }
-            )
-        except Exception as e:
-            _logger.warning(f"Skipping package {name_elem.text} due to version parsing error: {e}")
-
-    rpm_urls: List[Tuple[str, str]] = []
 
+def _select_locations(
+    location_map: Dict[str, List[PackageLocation]], package_names: List[str], only_latest: bool = True
+) -> List[Tuple[str, PackageLocation]]:
+    selected: List[Tuple[str, PackageLocation]] = []
     for pkg in package_names:
-        entries = packages_by_name.get(pkg, [])
+        entries = location_map.get(pkg, [])
         if only_latest:
-            latest = max(entries, key=lambda e: (e["epoch"], e["ver"], e["rel"]), default=None)
-            if latest:
-                rpm_urls.append((pkg, urljoin(base_url, latest["href"])))
+            if entries:
+                selected.append((pkg, entries[-1]))
         else:
-            for e in entries:
-                rpm_urls.append((pkg, urljoin(base_url, e["href"])))
+            selected.extend((pkg, e) for e in entries)
+    return selected
 
-    return rpm_urls
 
-
-def download_packages(
+def get_package_rpm_urls(
+    location_map: Dict[str, List[PackageLocation]],
+    base_url: str,
     package_names: List[str],
-    dep_map: Dict[str, Set[str]],
-    primary_root: ET.Element,
-    config: Config,
-    downloader: Downloader,
-    download_deps: bool = False,
-) -> None:
+    only_latest: bool = True,
+) -> List[Tuple[str, str]]:
+    return [
+        (pkg, urljoin(base_url, entry[3])) for pkg, entry in _select_locations(location_map, package_names, only_latest)
+    ]
+
+
+def _is_downloaded(dest_file: Path, expected_size: int, resumable: bool) -> bool:
+    try:
+        size = dest_file.stat().st_size
+    except FileNotFoundError:
+        return False
+    if expected_size and size != expected_size:
+        action = "resuming" if resumable and size < expected_size else "re-downloading"
+        tqdm.write(f"{LogColors.YELLOW}Incomplete download, {action}: {dest_file.name}{LogColors.RESET}")
+        return False
+    return True
+
+
+def download_packages(package_names: List[str], metadata: MetadataManager, download_deps: bool = False) -> None:
+    config = metadata.config
+    downloader = metadata.downloader
+    resumable = downloader.downloader_type == DownloaderType.PYTHON
     config.DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
     packages_to_download = set(package_names)
 
     if download_deps:
-        for pkg in package_names:
-            if pkg in dep_map:
-                packages_to_download.update(dep_map[pkg])
-
-    _logger.info(f"Downloading packages: {', '.join(sorted(packages_to_download))}")
-
-    rpm_urls: List[Tuple[str, str]] = []
-    for pkg in packages_to_download:
-        urls = get_package_rpm_urls(primary_root, config.REPO_BASE_URL, [pkg], only_latest=config.ONLY_LATEST_VERSION)
-        if not urls:
-            _logger.warning(f"No RPM URLs found for {pkg}")
+        packages_to_download.update(metadata.resolve_dependencies(package_names))
+
+    ordered = sorted(packages_to_download)
+    _logger.info(f"Downloading packages: {', '.join(ordered)}")
+
+    selected = _select_locations(metadata.location_map, ordered, only_latest=config.ONLY_LATEST_VERSION)
+    found = {pkg for pkg, _ in selected}
+    missing = sorted(packages_to_download - found)
+    if missing:
+        _logger.warning(f"No RPM URLs found for {', '.join(missing)}")
+
+    pending: List[Tuple[str, Path]] = []
+    for _, entry in selected:
+        dest_file = config.DOWNLOAD_DIR / Path(entry[3]).name
+        if _is_downloaded(dest_file, entry[4], resumable):
+            tqdm.write(f"{LogColors.YELLOW}Already downloaded: {dest_file.name}{LogColors.RESET}")
             continue
-        rpm_urls.extend(urls)
-
-    with tqdm(total=len(rpm_urls), desc="Downloading packages", unit="pkg") as bar:
-        for _, url in rpm_urls:
-            dest_file = config.DOWNLOAD_DIR / Path(url).name
-            if dest_file.exists():
-                tqdm.write(f"{LogColors.YELLOW}Already downloaded: {dest_file.name}{LogColors.RESET}")
-                bar.update(1)
-                continue
+        pending.append((urljoin(config.REPO_BASE_URL, entry[3]), dest_file))
+
+    with ThreadPoolExecutor(max_workers=max(1, int(config.DOWNLOAD_CONCURRENCY))) as pool:
+        futures = {pool.submit(downloader.download, url, dest_file, resumable): dest_file for url, dest_file in pending}
+        with tqdm(total=len(pending), desc="Downloading packages", unit="pkg") as bar:
             try:
-                downloader.download(url, dest_file)
-                tqdm.write(f"{LogColors.GREEN}Downloaded: {dest_file.name}{LogColors.RESET}")
-            except Exception as e:
-                tqdm.write(f"{LogColors.RED}Failed to download {dest_file.name}: {e}{LogColors.RESET}")
-            bar.update(1)
+                for future in as_completed(futures):
+                    dest_file = futures[future]
+                    try:
+                        future.result()
+                        tqdm.write(f"{LogColors.GREEN}Downloaded: {dest_file.name}{LogColors.RESET}")
+                    except Exception as e:
+                        tqdm.write(f"{LogColors.RED}Failed to download {dest_file.name}: {e}{LogColors.RESET}")
+                    bar.update(1)
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                raise
 
 
 def load_config_file(config_path: Path, config: Config) -> None:
@@ -164,7 +154,7 @@ def load_config_file(config_path: Path, config: Config) -> None:
         return
     try:
         with open(config_path, "r") as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=_YAML_LOADER)
         if data:
             config.update_from_dict(data)
             _logger.info(f"Loaded config from {config_path}")
@@ -179,7 +169,7 @@ def write_default_config(config_path: Path, config: Config) -> None:
     default_data = config.to_dict()
     try:
         with open(config_path, "w") as f:
-            yaml.safe_dump(default_data, f, sort_keys=False)
+            yaml.dump(default_data, f, Dumper=_YAML_DUMPER, sort_keys=False)
         _logger.info(f"Default config written to {config_path}")
     except Exception as e:
         _logger.error(f"Failed to write default config: {e}")
@@ -187,14 +177,14 @@ def write_default_config(config_path: Path, config: Config) -> None:
 
 def print_config(config: Config) -> None:
     print(f"\n{LogColors.BOLD}{LogColors.CYAN}--- Current Configuration ---{LogColors.RESET}")
-    for key in sorted(k for k in dir(config) if k.isupper()):
+    for key in config.keys():
         val = getattr(config, key)
         print(f"{LogColors.YELLOW}{key:20}{LogColors.RESET} = {LogColors.GREEN}{val}{LogColors.RESET}")
     print(f"{LogColors.BOLD}{LogColors.CYAN}-----------------------------{LogColors.RESET}\n")
 
 
 def edit_configuration(config: Config, config_path: Optional[Path] = None) -> None:
-    keys = sorted(k for k in dir(config) if k.isupper())
+    keys = config.keys()
     key_map = {str(i + 1): k for i, k in enumerate(keys)}
 
     while True:
@@ -287,7 +277,7 @@ def list_rpm_urls(
     if not selected:
         return
     urls = get_package_rpm_urls(
-        metadata.primary_root, metadata.config.REPO_BASE_URL, selected, only_latest=metadata.config.ONLY_LATEST_VERSION
+        metadata.location_map, metadata.config.REPO_BASE_URL, selected, only_latest=metadata.config.ONLY_LATEST_VERSION
     )
     if not urls:
         _logger.error("No RPM URLs found.")
@@ -302,14 +292,7 @@ def download_packages_ui(
     selected = select_packages(metadata, packages_str, ask_include_deps=include_deps)
     if not selected:
         return
-    download_packages(
-        selected,
-        metadata.dep_map,
-        metadata.primary_root,
-        metadata.config,
-        metadata.downloader,
-        download_deps=include_deps,
-    )
+    download_packages(selected, metadata, download_deps=include_deps)
 
 
 def configure_settings(metadata: MetadataManager, _, config_path: Optional[Path] = None) -> None:
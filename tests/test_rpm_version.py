@@ -0,0 +1,60 @@
+import pytest
+
+from winrpmdepscalc.metadata_manager import evr_key, rpm_version_key
+
+
+def _cmp(a, b) -> int:
+    return (a > b) - (a < b)
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        ("1.0", "1.0", 0),
+        ("1.0", "2.0", -1),
+        ("2.0.1", "2.0", 1),
+        ("2.0.1a", "2.0.1", 1),
+        ("1.10", "1.9", 1),
+        ("5.5p1", "5.5p10", -1),
+        ("5.5p2", "5.6p1", -1),
+        ("10xyz", "10.1xyz", -1),
+        ("xyz10", "xyz10.1", -1),
+        ("xyz.4", "8", -1),
+        ("6.0.rc1", "6.0", 1),
+        ("10b2", "10a1", 1),
+        ("1.0a", "1.0aa", -1),
+        ("1.01", "1.1", 0),
+        ("10.0001", "10.0039", -1),
+        ("4.999.9", "5.0", -1),
+        ("2.0", "2_0", 0),
+        ("a+", "a_", 0),
+        ("_+", "+_", 0),
+        ("1.0~rc1", "1.0", -1),
+        ("1.0~rc1", "1.0~rc2", -1),
+        ("1.0~rc1~git123", "1.0~rc1", -1),
+        ("1.0^", "1.0", 1),
+        ("1.0^", "1.0.1", -1),
+        ("1.0^git1", "1.0^git2", -1),
+        ("1.0^git1", "1.01", -1),
+        ("1.0^20160101^git1", "1.0^20160101", 1),
+        ("1.0~rc1^git1", "1.0~rc1", 1),
+        ("1.0^git1~pre", "1.0^git1", -1),
+    ],
+)
+def test_rpm_version_key_matches_rpmvercmp(a, b, expected):
+    assert _cmp(rpm_version_key(a), rpm_version_key(b)) == expected
+    assert _cmp(rpm_version_key(b), rpm_version_key(a)) == -expected
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        ((1, "1.0", "1"), (0, "9.9", "9"), 1),
+        ((0, "1.10", "1"), (0, "1.9", "9"), 1),
+        ((0, "1.0", "1.el9"), (0, "1.0", "1.el9_1"), -1),
+        ((0, "1.0", "10.el9"), (0, "1.0", "9.el9"), 1),
+        ((0, "1.0", "1"), (0, "1.0", "1"), 0),
+    ],
+)
+def test_evr_key_orders_epoch_then_version_then_release(a, b, expected):
+    assert _cmp(evr_key(*a), evr_key(*b)) == expected